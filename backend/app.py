@@ -1,22 +1,38 @@
 from __future__ import annotations
 
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import asynccontextmanager
 from pathlib import Path
 from typing import List, Optional, Dict, Any
 
+# t0 il prima possibile: misura l'avvio a freddo (import + startup)
+_IMPORT_T0 = time.perf_counter()
+
 import pandas as pd
-from fastapi import FastAPI, UploadFile, File, Body, Query
+from fastapi import FastAPI, UploadFile, File, Body, Query, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, FileResponse, Response
+from fastapi.responses import FileResponse, ORJSONResponse, Response
 from pydantic import BaseModel, Field
 
 # ── ML utils (nostri moduli)
 from ml.dataio import (
-    read_and_prepare_from_bytes,
-    read_and_prepare_from_file,
-    preview_records,
+    read_xml_bytes,
+    read_xml_file,
+    preview_frame,
+    parse_filter,
+    select_rows,
+    page_frame,
     TARGET_DEFAULT,
 )
-from ml.search import train_multi_model, export_model, RUNS, reset_runs  # usa le tue funzioni esistenti
+from ml.validation import validate_and_profile, drift_report, stats_from_profile
+from encoding import tabular_response
+# NB: ml.search (sklearn, estimatori, griglie) è importato in modo lazy, con import locali:
+# health e preview rispondono senza caricare sklearn.
 
 # ────────────────────────────────────────────────────────────────────────────────
 # Config
@@ -25,7 +41,41 @@ from ml.search import train_multi_model, export_model, RUNS, reset_runs  # usa l
 BASE_DIR = Path(__file__).resolve().parent
 DEFAULT_DATASET_PATH = BASE_DIR / "ml" / "data" / "dataset.xml"
 
-app = FastAPI(title="ML SPA XML", version="1.0.0")
+# Budget del tempo di avvio (secondi): oltre questa soglia logghiamo un warning
+STARTUP_BUDGET_S = float(os.getenv("ML_STARTUP_BUDGET_S", "1.5"))
+# Pre-carica lo stack ML (sklearn) in background dopo lo startup
+PRELOAD_ML = os.getenv("ML_PRELOAD", "0") == "1"
+
+logger = logging.getLogger("ml_spa")
+
+# Stato dello startup (esposto da /api/health)
+STARTUP: Dict[str, Any] = {
+    "startup_s": None,
+    "budget_s": STARTUP_BUDGET_S,
+    "within_budget": None,
+}
+
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    # Startup: nessun lavoro pesante qui, solo l'avvio del thread di preload
+    _start_default_preload()
+    startup_s = round(time.perf_counter() - _IMPORT_T0, 3)
+    STARTUP["startup_s"] = startup_s
+    STARTUP["within_budget"] = startup_s <= STARTUP_BUDGET_S
+    if not STARTUP["within_budget"]:
+        logger.warning(
+            "Startup in %.3fs oltre il budget di %.3fs", startup_s, STARTUP_BUDGET_S
+        )
+    yield
+
+
+app = FastAPI(
+    title="ML SPA XML",
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
+)
 
 # Consenti richieste dal frontend Vite (localhost)
 app.add_middleware(
@@ -38,6 +88,18 @@ app.add_middleware(
 
 # Cache in memoria dell'ultimo DataFrame caricato/pulito
 CURRENT_DF: Optional[pd.DataFrame] = None
+# Incrementata a ogni cambio di CURRENT_DF: invalida le cache derivate
+DATASET_VERSION = 0
+# Report di validazione + profilo calcolati all'ingest del DF attivo
+DATASET_REPORT: Optional[Dict[str, Any]] = None
+
+# Cache derivate dal DF attivo (valide per DATASET_VERSION)
+_VIEW_CACHE: Dict[tuple, Any] = {}
+VIEW_CACHE_MAX = 16
+
+# Preload in background del dataset di default
+_DF_LOCK = threading.RLock()
+_PRELOAD_THREAD: Optional[threading.Thread] = None
 
 
 # ────────────────────────────────────────────────────────────────────────────────
@@ -56,80 +118,284 @@ class TrainPayload(BaseModel):
     )
     search: str = Field("grid", description="grid | random")
     max_iters: int = Field(20, ge=1, description="Budget per RandomizedSearch (se usato)")
+    sample: Optional[int] = Field(
+        None,
+        ge=100,
+        description="Righe max del sottocampione stratificato per la ricerca iperparametri (None = tutto il training set)",
+    )
 
 
 # ────────────────────────────────────────────────────────────────────────────────
 # Helpers interni
 # ────────────────────────────────────────────────────────────────────────────────
 
+def _get_run(run_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Lookup di un run senza importare sklearn: se ml.search non è mai stato
+    importato non può esistere alcun run.
+    """
+    if "ml.search" not in sys.modules:
+        return None
+    from ml.search import RUNS
+
+    return RUNS.get(run_id)
+
+
+def _set_active_df(df: Optional[pd.DataFrame], report: Optional[Dict[str, Any]] = None) -> None:
+    """
+    Sostituisce il DF attivo (e il suo report di ingest), incrementa la
+    versione e svuota le cache derivate.
+    """
+    global CURRENT_DF, DATASET_VERSION, DATASET_REPORT
+    with _DF_LOCK:
+        CURRENT_DF = df
+        DATASET_REPORT = report
+        DATASET_VERSION += 1
+        _VIEW_CACHE.clear()
+
+
+def _ingest_default() -> pd.DataFrame:
+    """
+    read → exclude → clean → validazione/profilo del dataset di default.
+    Il parse avviene fuori dal lock; il risultato viene installato solo se
+    nel frattempo nessun upload ha già impostato un DF attivo.
+    """
+    df, report = validate_and_profile(read_xml_file(str(DEFAULT_DATASET_PATH)))
+    with _DF_LOCK:
+        if CURRENT_DF is None:
+            _set_active_df(df, report)
+        return CURRENT_DF
+
+
+def _preload_default() -> None:
+    """
+    Eseguito in un thread dopo lo startup: parse del dataset di default
+    (se nessun upload è arrivato nel frattempo) e, opzionale, import di sklearn.
+    """
+    try:
+        if CURRENT_DF is None:
+            _ingest_default()
+    except Exception:
+        logger.exception("Preload del dataset di default fallito")
+    if PRELOAD_ML:
+        try:
+            import ml.search  # noqa: F401
+        except Exception:
+            logger.exception("Preload dello stack ML fallito")
+
+
+def _start_default_preload() -> None:
+    global _PRELOAD_THREAD
+    if not DEFAULT_DATASET_PATH.exists():
+        return
+    _PRELOAD_THREAD = threading.Thread(
+        target=_preload_default, name="default-dataset-preload", daemon=True
+    )
+    _PRELOAD_THREAD.start()
+
+
 def _get_active_df() -> pd.DataFrame:
     """
     Restituisce il DF attivo in memoria se presente,
     altrimenti carica quello di default dal disco (pulito).
+    Se il preload è in corso, lo attende invece di riparsare.
     """
-    global CURRENT_DF
     if CURRENT_DF is not None:
         return CURRENT_DF
+    if _PRELOAD_THREAD is not None and _PRELOAD_THREAD.is_alive():
+        _PRELOAD_THREAD.join()
+        if CURRENT_DF is not None:
+            return CURRENT_DF
     # fallback: dataset di default
-    df = read_and_prepare_from_file(str(DEFAULT_DATASET_PATH))
-    CURRENT_DF = df
-    return df
+    return _ingest_default()
+
+
+def _get_active_view() -> tuple[pd.DataFrame, int, Optional[Dict[str, Any]]]:
+    """
+    Come _get_active_df, ma restituisce insieme (sotto _DF_LOCK) anche la
+    versione del dataset (chiave delle cache) e il report di ingest, così che
+    profilo e dati descrivano sempre lo stesso DF.
+    """
+    while True:
+        _get_active_df()
+        with _DF_LOCK:
+            # un reset tra le due letture riporta CURRENT_DF a None: si riprova
+            if CURRENT_DF is not None:
+                return CURRENT_DF, DATASET_VERSION, DATASET_REPORT
 
 
 # ────────────────────────────────────────────────────────────────────────────────
 # API
 # ────────────────────────────────────────────────────────────────────────────────
 
+@app.get("/api/health")
+def api_health() -> ORJSONResponse:
+    """
+    Liveness/readiness leggero: non importa sklearn né tocca il dataset.
+    """
+    return ORJSONResponse(content={
+        "ok": True,
+        "startup": STARTUP,
+        "dataset_ready": CURRENT_DF is not None,
+        "ml_loaded": "ml.search" in sys.modules,
+    })
+
+
 @app.post("/api/upload-xml")
-async def upload_xml(file: UploadFile | None = File(default=None)) -> JSONResponse:
+async def upload_xml(
+    request: Request, file: UploadFile | None = File(default=None)
+) -> Response:
     """
     Carica un XML (multipart). Se assente, usa dataset predefinito.
-    Esegue: read → exclude → clean. Salva in memoria CURRENT_DF.
+    Esegue: read → exclude → clean → validazione/profilo. Salva in memoria CURRENT_DF.
     Ritorna anteprima (prime righe post-cleaning).
     """
-    global CURRENT_DF
     try:
         if file is not None:
             data = await file.read()
-            df = read_and_prepare_from_bytes(data)
-            CURRENT_DF = df
+            raw = await run_in_threadpool(read_xml_bytes, data)
         else:
-            df = read_and_prepare_from_file(str(DEFAULT_DATASET_PATH))
-            CURRENT_DF = df
+            raw = await run_in_threadpool(read_xml_file, str(DEFAULT_DATASET_PATH))
+        # parse/profilo e swap (che prende _DF_LOCK) fuori dall'event loop
+        df, report = await run_in_threadpool(validate_and_profile, raw)
+        await run_in_threadpool(_set_active_df, df, report)
 
-        prev = preview_records(df, limit=5)
-        return JSONResponse(content=prev)
+        frame, meta = preview_frame(df, limit=5)
+        return tabular_response(request, frame, meta, records_key="preview")
     except Exception as e:
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=400,
             content={"error": f"Errore parsing XML: {str(e)}"},
         )
 
 
 @app.get("/api/preview")
-def api_preview(limit: int = Query(5, ge=1, le=50)) -> JSONResponse:
+def api_preview(request: Request, limit: int = Query(5, ge=1, le=50)) -> Response:
     """
     Anteprima N righe dal DF attivo (post-cleaning).
+    Con `Accept: application/vnd.apache.arrow.stream` risponde in Arrow IPC.
     """
     try:
         df = _get_active_df()
-        prev = preview_records(df, limit=limit)
-        return JSONResponse(content=prev)
+        frame, meta = preview_frame(df, limit=limit)
+        return tabular_response(request, frame, meta, records_key="preview")
     except Exception as e:
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=400,
             content={"error": f"Impossibile generare l'anteprima: {str(e)}"},
         )
 
 
+@app.get("/api/data")
+def api_data(
+    request: Request,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=1000),
+    columns: Optional[str] = Query(None, description="Colonne separate da virgola"),
+    filters_raw: Optional[List[str]] = Query(None, alias="filter", description="colonna:op:valore (ripetibile)"),
+    sort: Optional[str] = Query(None, description="Colonna di ordinamento"),
+    desc: bool = Query(False),
+) -> Response:
+    """
+    Accesso paginato al DF attivo (già pulito) con proiezione colonne,
+    filtri semplici e ordinamento. Le posizioni filtrate/ordinate sono in
+    cache per versione del dataset: ogni pagina serializza solo `limit` righe.
+    """
+    try:
+        df, version, _ = _get_active_view()
+        filters = tuple(parse_filter(f) for f in (filters_raw or []))
+        key = (version, filters, sort, desc)
+        with _DF_LOCK:
+            positions = _VIEW_CACHE.get(key)
+        if positions is None:
+            # calcolo fuori dal lock, solo get/evict/insert sotto lock
+            positions = select_rows(df, filters, sort_by=sort, descending=desc)
+            with _DF_LOCK:
+                # niente scrittura se nel frattempo il dataset è cambiato
+                if version == DATASET_VERSION:
+                    while len(_VIEW_CACHE) >= VIEW_CACHE_MAX:
+                        _VIEW_CACHE.pop(next(iter(_VIEW_CACHE)))
+                    _VIEW_CACHE[key] = positions
+        cols = [c.strip() for c in columns.split(",") if c.strip()] if columns else None
+        frame, meta = page_frame(df, positions, offset=offset, limit=limit, columns=cols)
+        meta["version"] = version
+        return tabular_response(request, frame, meta, records_key="records")
+    except Exception as e:
+        return ORJSONResponse(
+            status_code=400,
+            content={"error": f"Impossibile leggere i dati: {str(e)}"},
+        )
+
+
+@app.get("/api/stats")
+def api_stats() -> ORJSONResponse:
+    """
+    Statistiche per colonna del DF attivo, ricavate dal profilo calcolato una
+    volta all'ingest (nessuna nuova scansione del frame).
+    """
+    try:
+        _, version, report = _get_active_view()
+        stats = stats_from_profile((report or {})["profile"])
+        stats["version"] = version
+        return ORJSONResponse(content=stats)
+    except Exception as e:
+        return ORJSONResponse(
+            status_code=400,
+            content={"error": f"Impossibile calcolare le statistiche: {str(e)}"},
+        )
+
+
+@app.get("/api/validation")
+def api_validation() -> ORJSONResponse:
+    """
+    Report di ingest del DF attivo: violazioni di schema e profilo per colonna.
+    """
+    try:
+        _, _, report = _get_active_view()
+        return ORJSONResponse(content=report or {})
+    except Exception as e:
+        return ORJSONResponse(
+            status_code=400,
+            content={"error": f"Impossibile leggere il report di validazione: {str(e)}"},
+        )
+
+
+@app.get("/api/drift")
+def api_drift(run_id: str = Query(...)) -> ORJSONResponse:
+    """
+    Drift tra il profilo del DF attivo e quello salvato nei metadata del run:
+    usa solo i profili, senza riscansionare i dati.
+    """
+    try:
+        entry = _get_run(run_id)
+        if not entry:
+            return ORJSONResponse(status_code=404, content={"error": "run_id non trovato"})
+        _, _, report = _get_active_view()
+        reference = entry["metadata"].get("data_profile")
+        current = (report or {}).get("profile")
+        if not reference or not current:
+            return ORJSONResponse(status_code=404, content={"error": "Profilo dati non disponibile"})
+        return ORJSONResponse(content=drift_report(reference, current))
+    except Exception as e:
+        return ORJSONResponse(
+            status_code=400,
+            content={"error": f"Errore nel calcolo del drift: {str(e)}"},
+        )
+
+
 @app.post("/api/train")
-def api_train(payload: TrainPayload) -> JSONResponse:
+def api_train(payload: TrainPayload) -> ORJSONResponse:
     """
     Avvia training multi-modello (Grid/Random CV=5) sul DF attivo.
     Ritorna risultati per modello + best_overall + run_id.
     """
     try:
-        df = _get_active_df()
+        # DF e profilo letti come coppia: il profilo salvato nel run descrive
+        # esattamente i dati di training
+        df, _, report = _get_active_view()
+        # import locale: sklearn viene caricato solo al primo training
+        from ml.search import train_multi_model
+
         out: Dict[str, Any] = train_multi_model(
             df=df,
             target=payload.target,
@@ -141,30 +407,32 @@ def api_train(payload: TrainPayload) -> JSONResponse:
             selected_models=payload.selected_models,
             search=payload.search,
             max_iters=payload.max_iters,
+            sample=payload.sample,
+            data_profile=(report or {}).get("profile"),
         )
         # Nota: assicurati che train_multi_model ritorni dict con keys
-        # {"results": [...], "best_overall": {...}, "run_id": "..."}
-        return JSONResponse(content=out)
+        # {"results": [...], "best_overall": {...}, "run_id": "...", "sample": {...} | None}
+        return ORJSONResponse(content=out)
     except Exception as e:
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=400,
             content={"error": f"Errore durante il training: {str(e)}"},
         )
 
 
 @app.get("/api/best")
-def api_best(run_id: str = Query(...)) -> JSONResponse:
+def api_best(run_id: str = Query(...)) -> ORJSONResponse:
     """
     Ritorna il riepilogo del miglior modello per un run.
     """
     try:
-        entry = RUNS.get(run_id)
+        entry = _get_run(run_id)
         if not entry:
-            return JSONResponse(status_code=404, content={"error": "run_id non trovato"})
+            return ORJSONResponse(status_code=404, content={"error": "run_id non trovato"})
         best = entry.get("best_overall") or entry.get("best") or {}
-        return JSONResponse(content=best)
+        return ORJSONResponse(content=best)
     except Exception as e:
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=400,
             content={"error": f"Errore nel recupero best model: {str(e)}"},
         )
@@ -173,9 +441,11 @@ def api_best(run_id: str = Query(...)) -> JSONResponse:
 @app.get("/api/download/model")
 def api_download_model(run_id: str = Query(...)) -> Response:
     try:
+        from ml.search import export_model
+
         pkl_path, json_path = export_model(run_id)
         if not Path(pkl_path).exists():
-            return JSONResponse(status_code=404, content={"error": "Modello non trovato"})
+            return ORJSONResponse(status_code=404, content={"error": "Modello non trovato"})
         filename = Path(pkl_path).name
         return FileResponse(
             path=pkl_path,
@@ -183,7 +453,7 @@ def api_download_model(run_id: str = Query(...)) -> Response:
             filename=filename,
         )
     except Exception as e:
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=400,
             content={"error": f"Errore export modello: {str(e)}"},
         )
@@ -192,9 +462,11 @@ def api_download_model(run_id: str = Query(...)) -> Response:
 @app.get("/api/download/metadata")
 def api_download_metadata(run_id: str = Query(...)) -> Response:
     try:
+        from ml.search import export_model
+
         pkl_path, json_path = export_model(run_id)
         if not Path(json_path).exists():
-            return JSONResponse(status_code=404, content={"error": "Metadata non trovati"})
+            return ORJSONResponse(status_code=404, content={"error": "Metadata non trovati"})
         filename = Path(json_path).name
         return FileResponse(
             path=json_path,
@@ -202,17 +474,20 @@ def api_download_metadata(run_id: str = Query(...)) -> Response:
             filename=filename,
         )
     except Exception as e:
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=400,
             content={"error": f"Errore export metadata: {str(e)}"},
         )
 
 @app.post("/api/reset")
-def api_reset() -> JSONResponse:
-    global CURRENT_DF
-    CURRENT_DF = None
+def api_reset() -> ORJSONResponse:
+    _set_active_df(None)
     try:
-        reset_runs()
+        # se ml.search non è mai stato importato non ci sono run da svuotare
+        if "ml.search" in sys.modules:
+            from ml.search import reset_runs
+
+            reset_runs()
     except Exception:
         pass
-    return JSONResponse(content={"ok": True})
\ No newline at end of file
+    return ORJSONResponse(content={"ok": True})
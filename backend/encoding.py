@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+import pandas as pd
+from fastapi import Request
+from fastapi.responses import ORJSONResponse, Response
+
+JSON_MEDIA_TYPE = "application/json"
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+ARROW_METADATA_KEY = b"ml_spa"
+
+# stessa URL, rappresentazioni diverse in base all'Accept
+VARY_HEADERS = {"Vary": "Accept"}
+
+
+def parse_accept(header: str) -> List[Tuple[str, float]]:
+    """
+    Media range dell'header Accept con il relativo q (default 1.0).
+    """
+    ranges: List[Tuple[str, float]] = []
+    for part in header.split(","):
+        items = [p.strip() for p in part.split(";")]
+        media = items[0].lower()
+        if not media:
+            continue
+        q = 1.0
+        for param in items[1:]:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        ranges.append((media, q))
+    return ranges
+
+
+def _quality(ranges: List[Tuple[str, float]], media_type: str) -> float:
+    """
+    q del range più specifico che copre `media_type` (tipo esatto > tipo/* > */*).
+    """
+    main = media_type.split("/")[0]
+    best: Optional[Tuple[int, float]] = None
+    for media, q in ranges:
+        if media == media_type:
+            spec = 2
+        elif media == f"{main}/*":
+            spec = 1
+        elif media == "*/*":
+            spec = 0
+        else:
+            continue
+        if best is None or spec > best[0]:
+            best = (spec, q)
+    return best[1] if best else 0.0
+
+
+def wants_arrow(request: Request) -> bool:
+    """
+    Content negotiation: Arrow IPC solo se richiesto esplicitamente nell'Accept
+    (q > 0) e con priorità non inferiore al JSON; altrimenti JSON.
+    """
+    ranges = parse_accept(request.headers.get("accept", ""))
+    if not any(media == ARROW_MEDIA_TYPE for media, _ in ranges):
+        return False
+    arrow_q = _quality(ranges, ARROW_MEDIA_TYPE)
+    return arrow_q > 0 and arrow_q >= _quality(ranges, JSON_MEDIA_TYPE)
+
+
+def arrow_available() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def arrow_response(frame: pd.DataFrame, meta: Optional[Dict[str, Any]] = None) -> Response:
+    """
+    Serializza un DataFrame come stream Arrow IPC (colonnare). I campi non
+    tabellari (total, offset, ...) finiscono nei metadata dello schema.
+    """
+    # import locale: pyarrow è pesante e serve solo per questo formato
+    import pyarrow as pa
+
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    if meta:
+        table = table.replace_schema_metadata({
+            **(table.schema.metadata or {}),
+            ARROW_METADATA_KEY: json.dumps(meta).encode("utf-8"),
+        })
+
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return Response(
+        content=sink.getvalue().to_pybytes(),
+        media_type=ARROW_MEDIA_TYPE,
+        headers=VARY_HEADERS,
+    )
+
+
+def tabular_response(
+    request: Request,
+    frame: pd.DataFrame,
+    meta: Dict[str, Any],
+    records_key: str,
+) -> Response:
+    """
+    Risposta per output tabellari: Arrow IPC se negoziato (e pyarrow presente),
+    altrimenti JSON con `meta` + record sotto `records_key`.
+    """
+    if wants_arrow(request) and arrow_available():
+        return arrow_response(frame, meta)
+    # NA di pandas -> None (orjson non conosce pd.NA)
+    records = frame.astype(object).where(frame.notna(), None).to_dict(orient="records")
+    return ORJSONResponse(content={**meta, records_key: records}, headers=VARY_HEADERS)
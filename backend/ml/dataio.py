@@ -1,6 +1,7 @@
 from __future__ import annotations
 import io
-from typing import Dict, List, Tuple
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import numpy as np
 import pandas as pd
 
 from pathlib import Path
@@ -36,7 +37,7 @@ def trim_strings(df: pd.DataFrame) -> pd.DataFrame:
     return df2
 
 
-def clean_dataframe(df: pd.DataFrame) -> pd.DataFrame:
+def clean_dataframe(df: pd.DataFrame, issues: Optional[List[Dict]] = None) -> pd.DataFrame:
     """
     Pulizia leggera (pre-imputazione):
     - trim stringhe
@@ -45,6 +46,8 @@ def clean_dataframe(df: pd.DataFrame) -> pd.DataFrame:
     - forza il tipo numerico sulle colonne numeriche (valori non validi -> NaN)
     - rimuove eventuali colonne costanti
     Nota: l'imputazione dei NaN è delegata alla Pipeline (SimpleImputer).
+    Se passata, `issues` viene popolata con le coercizioni e le colonne rimosse
+    (invece di scartarle in silenzio).
     """
     df2 = trim_strings(df)
     df2 = df2.drop_duplicates().reset_index(drop=True)
@@ -56,18 +59,43 @@ def clean_dataframe(df: pd.DataFrame) -> pd.DataFrame:
     # 2) forza tipo numerico sulle colonne dichiarate numeriche (se esistono nel DF)
     for col in NUMERIC_COLS:
         if col in df2.columns:
+            before = df2[col].notna()
             df2[col] = pd.to_numeric(df2[col], errors="coerce")
+            coerced = int((before & df2[col].isna()).sum())
+            if issues is not None and coerced:
+                issues.append({
+                    "column": col,
+                    "type": "coerced_to_nan",
+                    "detail": f"{coerced} valori non numerici convertiti in NaN",
+                })
 
     # 3) rimuovi colonne costanti (stessa singola modalità)
     nunique = df2.nunique(dropna=False)
     constant_cols = nunique[nunique <= 1].index.tolist()
     # tieni il target anche se costante, per sicurezza
     constant_cols = [c for c in constant_cols if c not in (TARGET_DEFAULT,)]
+    if issues is not None:
+        issues.extend(
+            {"column": c, "type": "constant_column_dropped", "detail": "colonna costante rimossa"}
+            for c in constant_cols
+        )
     if constant_cols:
         df2 = df2.drop(columns=constant_cols, errors="ignore")
 
     return df2
 
+def is_numeric_column(df: pd.DataFrame, col: str) -> bool:
+    """
+    Lo schema dichiarato ha la precedenza; il dtype decide solo per le
+    colonne fuori schema.
+    """
+    if col in NUMERIC_COLS:
+        return True
+    if col in CATEGORICAL_COLS or col == TARGET_DEFAULT:
+        return False
+    return df[col].dtype.kind in "if"
+
+
 def get_feature_sets(df: pd.DataFrame) -> Tuple[List[str], List[str]]:
     nums = [c for c in NUMERIC_COLS if c in df.columns]
     cats = [c for c in CATEGORICAL_COLS if c in df.columns]
@@ -83,20 +111,103 @@ def load_default_or_raise() -> pd.DataFrame:
     return read_xml_file(str(DEFAULT_DATASET_PATH))
 
 
-def preview_records(df: pd.DataFrame, limit: int = 5) -> Dict:
-    # escludi colonne vietate (es. Id), poi pulisci
-    df_view = exclude_columns(df)
-    df_view = clean_dataframe(df_view)
+def preview_frame(df: pd.DataFrame, limit: int = 5) -> Tuple[pd.DataFrame, Dict]:
+    """
+    Prime `limit` righe + meta (rows/cols/columns) del DF attivo, già escluso
+    e pulito all'ingest: nessuna ri-pulizia dell'intero frame.
+    """
+    meta = {
+        "rows": len(df),
+        "cols": len(df.columns),
+        "columns": list(df.columns),
+    }
+    return df.head(limit), meta
+
+# === Accesso paginato e statistiche (DF già pulito) ===
+FILTER_OPS = ("eq", "ne", "gt", "ge", "lt", "le", "contains")
+
 
-    df_prev = df_view.head(limit)
-    return {
-        "rows": len(df_view),
-        "cols": len(df_view.columns),
-        "preview": df_prev.to_dict(orient="records"),
-        "columns": list(df_view.columns),
+def parse_filter(spec: str) -> Tuple[str, str, str]:
+    """
+    Filtro nel formato "colonna:op:valore" (es. "Age:gt:30", "Gender:eq:Male").
+    """
+    parts = spec.split(":", 2)
+    if len(parts) != 3 or parts[1] not in FILTER_OPS:
+        raise ValueError(f"Filtro non valido '{spec}' (atteso colonna:op:valore, op in {FILTER_OPS})")
+    return parts[0], parts[1], parts[2]
+
+
+def select_rows(
+    df: pd.DataFrame,
+    filters: Sequence[Tuple[str, str, str]] = (),
+    sort_by: Optional[str] = None,
+    descending: bool = False,
+) -> np.ndarray:
+    """
+    Restituisce le posizioni (iloc) delle righe che soddisfano i filtri,
+    ordinate per `sort_by`. Il risultato è riusabile per tutte le pagine
+    della stessa vista, senza rifare filtro/ordinamento.
+    """
+    mask = np.ones(len(df), dtype=bool)
+    for col, op, raw in filters:
+        if col not in df.columns:
+            raise ValueError(f"Colonna '{col}' non presente nel dataset.")
+        series = df[col]
+        if op == "contains":
+            mask &= series.astype("string").str.contains(raw, case=False, regex=False).fillna(False).to_numpy(dtype=bool)
+            continue
+        value: Any = float(raw) if series.dtype.kind in "if" else raw
+        cmp = {
+            "eq": series.eq, "ne": series.ne,
+            "gt": series.gt, "ge": series.ge,
+            "lt": series.lt, "le": series.le,
+        }[op]
+        mask &= cmp(value).fillna(False).to_numpy(dtype=bool)
+
+    positions = np.flatnonzero(mask)
+    if sort_by is not None:
+        if sort_by not in df.columns:
+            raise ValueError(f"Colonna '{sort_by}' non presente nel dataset.")
+        keys = df[sort_by].iloc[positions]
+        # mergesort: stabile, NaN sempre in fondo
+        order = keys.reset_index(drop=True).sort_values(
+            ascending=not descending, kind="mergesort", na_position="last"
+        ).index.to_numpy()
+        positions = positions[order]
+    return positions
+
+
+def page_frame(
+    df: pd.DataFrame,
+    positions: np.ndarray,
+    offset: int = 0,
+    limit: int = 50,
+    columns: Optional[List[str]] = None,
+) -> Tuple[pd.DataFrame, Dict]:
+    """
+    Estrae solo la pagina richiesta (offset/limit) con proiezione colonne,
+    restituendo (frame, meta).
+    """
+    if columns:
+        missing = [c for c in columns if c not in df.columns]
+        if missing:
+            raise ValueError(f"Colonne non presenti nel dataset: {missing}")
+    else:
+        columns = list(df.columns)
+
+    page = df.iloc[positions[offset:offset + limit]][columns]
+    meta = {
+        "total": int(len(positions)),
+        "offset": offset,
+        "limit": limit,
+        "columns": columns,
     }
+    return page, meta
+
 
 # === Helper comodi per “leggi → escludi → pulisci” ===
+# Mantenuti per compatibilità (script/notebook): l'app ora passa da
+# ml.validation.validate_and_profile, che traccia anche coercizioni e profilo.
 def read_and_prepare_from_file(path: str = str(DEFAULT_DATASET_PATH), xpath: str = ".//row") -> pd.DataFrame:
     with open(path, "rb") as f:
         df = pd.read_xml(f, xpath=xpath)
@@ -9,6 +9,7 @@ from typing import Any, Dict, List, Optional, Protocol, runtime_checkable, cast
 
 import numpy as np
 import pandas as pd
+from sklearn.base import clone
 from sklearn.metrics import classification_report, confusion_matrix
 from sklearn.model_selection import (
     GridSearchCV,
@@ -18,7 +19,7 @@ from sklearn.model_selection import (
 )
 from sklearn.preprocessing import LabelEncoder
 
-from .dataio import EXCLUDE_COLS, TARGET_DEFAULT
+from .dataio import EXCLUDE_COLS, TARGET_DEFAULT, is_numeric_column
 from .metrics import compute_metrics
 from .pipeline import build_pipeline, make_model_specs
 
@@ -26,8 +27,8 @@ from .pipeline import build_pipeline, make_model_specs
 # ────────────────────────────────────────────────────────────────────────────────
 # Persistenza export
 # ────────────────────────────────────────────────────────────────────────────────
+# La cartella viene creata solo al primo export (niente I/O all'import)
 EXPORT_DIR = Path(__file__).resolve().parent.parent / "exports"
-EXPORT_DIR.mkdir(parents=True, exist_ok=True)
 
 
 # ────────────────────────────────────────────────────────────────────────────────
@@ -68,6 +69,48 @@ class RunStore:
 RUNS = RunStore()
 
 
+def stratified_subsample(
+    X: pd.DataFrame,
+    y: np.ndarray,
+    size: int,
+    min_per_class: int,
+    random_state: int = 42,
+) -> tuple[pd.DataFrame, np.ndarray]:
+    """
+    Sottocampione stratificato di al più `size` righe. Ogni classe riceve
+    prima `min_per_class` righe (se disponibili), così che la StratifiedKFold
+    resti valida anche per le classi rare; le righe restanti sono ripartite in
+    proporzione alla distribuzione del target (resti più grandi per gli arrotondamenti).
+    """
+    if size >= len(y):
+        return X, y
+
+    classes, counts = np.unique(y, return_counts=True)
+    reserved = np.minimum(counts, min_per_class)
+    if reserved.sum() > size:
+        raise ValueError(
+            f"sample={size} troppo piccolo: servono almeno {int(reserved.sum())} righe "
+            f"({min_per_class} per ciascuna delle {len(classes)} classi)."
+        )
+
+    # ripartizione proporzionale del resto sulla capacità residua di ogni classe
+    capacity = counts - reserved
+    extra = size - int(reserved.sum())
+    ideal = extra * capacity / capacity.sum()
+    share = np.floor(ideal).astype(int)
+    leftover = extra - int(share.sum())
+    share[np.argsort(-(ideal - share), kind="stable")[:leftover]] += 1
+    quotas = reserved + share
+
+    rng = np.random.default_rng(random_state)
+    idx_parts: List[np.ndarray] = []
+    for cls, quota in zip(classes, quotas):
+        cls_idx = np.flatnonzero(y == cls)
+        idx_parts.append(rng.choice(cls_idx, size=int(quota), replace=False))
+    idx = np.sort(np.concatenate(idx_parts))
+    return X.iloc[idx], y[idx]
+
+
 # ────────────────────────────────────────────────────────────────────────────────
 # Training multi-modello
 # ────────────────────────────────────────────────────────────────────────────────
@@ -82,6 +125,8 @@ def train_multi_model(
     selected_models: Optional[List[str]] = None,
     search: str = "grid",  # "grid" | "random"
     max_iters: int = 20,
+    sample: Optional[int] = None,
+    data_profile: Optional[Dict[str, Any]] = None,
 ) -> Dict[str, Any]:
     """
     Esegue il training multi-modello (pipelines + CV + hyperparameter search)
@@ -89,6 +134,17 @@ def train_multi_model(
       - results: lista con metriche e iperparametri per ciascun modello
       - best_overall: modello migliore per F1-macro
       - run_id: id per scaricare .pkl e metadata .json
+      - sample: info sul sottocampione usato per la ricerca (None se non richiesto;
+        con `sample` >= righe di training, size == train_rows)
+
+    `data_profile` (profilo calcolato all'ingest) viene salvato nei metadata
+    del run come riferimento per il controllo del drift.
+
+    Con `sample` la ricerca iperparametri gira su un sottocampione stratificato
+    di X_train di al più `sample` righe e i modelli sono confrontati per score
+    CV sul sottocampione; solo il vincitore viene ri-addestrato sull'intero
+    training set. Le metriche degli altri modelli restano quelle del fit sul
+    sottocampione (`fitted_on: "sample"`).
     """
     if selected_models is None or len(selected_models) == 0:
         selected_models = ["logreg", "svc", "knn", "dt", "rf", "nb"]
@@ -113,9 +169,30 @@ def train_multi_model(
         X, y_all, test_size=test_size, random_state=random_state, stratify=y_all
     )
 
-    # Rileva colonne numeriche/categoriche per il ColumnTransformer
-    numeric_cols = [c for c in X.columns if X[c].dtype.kind in "if"]
-    categorical_cols = [c for c in X.columns if X[c].dtype.kind not in "if"]
+    # Sottocampione stratificato (solo per la ricerca iperparametri)
+    if sample is not None and sample < len(y_train_enc):
+        X_search, y_search = stratified_subsample(
+            X_train, y_train_enc, size=sample, min_per_class=cv, random_state=random_state
+        )
+        sample_info: Optional[Dict[str, Any]] = {
+            "requested": sample,
+            "size": int(len(y_search)),
+            "train_rows": int(len(y_train_enc)),
+        }
+    else:
+        X_search, y_search = X_train, y_train_enc
+        # sample richiesto ma >= training set: si usa tutto, e lo si dice
+        sample_info = None if sample is None else {
+            "requested": sample,
+            "size": int(len(y_train_enc)),
+            "train_rows": int(len(y_train_enc)),
+        }
+    use_sample = X_search is not X_train
+
+    # Colonne numeriche/categoriche per il ColumnTransformer: lo schema
+    # dichiarato ha la precedenza, il dtype decide solo per colonne fuori schema
+    numeric_cols = [c for c in X.columns if is_numeric_column(X, c)]
+    categorical_cols = [c for c in X.columns if c not in numeric_cols]
 
     # CV splitter
     cv_splitter = StratifiedKFold(n_splits=cv, shuffle=True, random_state=random_state)
@@ -126,6 +203,15 @@ def train_multi_model(
     results: List[Dict[str, Any]] = []
     best_overall: Optional[Dict[str, Any]] = None
     best_estimator: Optional[Any] = None
+    best_pipe: Optional[Any] = None
+
+    def _evaluate(estimator: Any) -> Dict[str, Any]:
+        y_pred_enc = cast(HasPredict, estimator).predict(X_test)
+        # Torna alle etichette originali (stringhe) per report e CM
+        y_true = le.inverse_transform(y_test_enc)
+        y_pred = le.inverse_transform(y_pred_enc)
+        # Calcolo metriche coerenti e complete (F1-macro, accuracy, report, CM, labels)
+        return compute_metrics(y_true, y_pred, labels_order)
 
     for key in selected_models:
         if key not in model_specs:
@@ -165,33 +251,42 @@ def train_multi_model(
             )
 
         t0 = time.time()
-        searcher.fit(X_train, y_train_enc)
+        searcher.fit(X_search, y_search)
         train_time = round(time.time() - t0, 3)
 
-        # Predizione su test con il best estimator
-        best_est = cast(HasPredict, searcher.best_estimator_)
-        y_pred_enc = best_est.predict(X_test)
-
-        # Torna alle etichette originali (stringhe) per report e CM
-        y_true = le.inverse_transform(y_test_enc)
-        y_pred = le.inverse_transform(y_pred_enc)
-
-        # Calcolo metriche coerenti e complete (F1-macro, accuracy, report, CM, labels)
-        # compute_metrics deve creare la CM con labels=labels_order e restituire anche "labels"
-        metrics = compute_metrics(y_true, y_pred, labels_order)
+        # Predizione su test con il best estimator (fittato sul sottocampione se `sample`)
+        metrics = _evaluate(searcher.best_estimator_)
 
         res = {
             "key": key,
             "name": spec.name,
             "best_params": searcher.best_params_,
+            "cv_score": float(searcher.best_score_),
             "metrics": metrics,
             "train_time_s": train_time,
+            "fitted_on": "sample" if use_sample else "full_train",
         }
         results.append(res)
 
-        if (best_overall is None) or (metrics["f1_macro"] > best_overall["metrics"]["f1_macro"]):
+        # con `sample` il confronto usa lo score CV sul sottocampione: le metriche
+        # di test di modelli fittati su dati diversi non sarebbero confrontabili
+        if use_sample:
+            better = best_overall is None or res["cv_score"] > best_overall["cv_score"]
+        else:
+            better = best_overall is None or metrics["f1_macro"] > best_overall["metrics"]["f1_macro"]
+        if better:
             best_overall = res
             best_estimator = searcher.best_estimator_
+            best_pipe = pipe
+
+    if use_sample and best_overall is not None:
+        # refit della sola configurazione vincente sull'intero training set
+        t0 = time.time()
+        best_estimator = clone(best_pipe).set_params(**best_overall["best_params"])
+        best_estimator.fit(X_train, y_train_enc)
+        best_overall["refit_time_s"] = round(time.time() - t0, 3)
+        best_overall["metrics"] = _evaluate(best_estimator)
+        best_overall["fitted_on"] = "full_train"
 
     if best_overall is None or best_estimator is None:
         raise ValueError(
@@ -207,6 +302,7 @@ def train_multi_model(
         "cv": cv,
         "scoring": scoring,
         "selected_models": selected_models,
+        "sample": sample_info,
         "best_model": {
             "key": best_overall["key"],
             "name": best_overall["name"],
@@ -219,6 +315,7 @@ def train_multi_model(
         },
         "columns": list(X.columns),
         "class_labels": labels_order,
+        "data_profile": data_profile,
     }
 
     run_id = RUNS.create(best_estimator, metadata)
@@ -227,6 +324,7 @@ def train_multi_model(
         "run_id": run_id,
         "results": results,
         "best_overall": best_overall,
+        "sample": sample_info,
     }
 
 
@@ -245,6 +343,7 @@ def export_model(run_id: str) -> tuple[str, str]:
     model = entry["best_estimator"]
     meta = entry["metadata"]
 
+    EXPORT_DIR.mkdir(parents=True, exist_ok=True)
     pkl_path = EXPORT_DIR / f"best_model_{run_id}.pkl"
     json_path = EXPORT_DIR / f"metadata_{run_id}.json"
 
@@ -0,0 +1,246 @@
+from __future__ import annotations
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .dataio import (
+    CATEGORICAL_COLS,
+    NUMERIC_COLS,
+    TARGET_DEFAULT,
+    clean_dataframe,
+    exclude_columns,
+    is_numeric_column,
+)
+
+# Parametri del profilo
+MAX_CATEGORIES = 1000
+TOP_K_CATEGORIES = 10
+# percentili nel profilo; il PSI usa i decili di riferimento come bin
+QUANTILE_PROBS = [round(float(p), 2) for p in np.linspace(0.0, 1.0, 101)]
+PSI_BINS = 10
+OTHER_CATEGORY = "__other__"
+
+# Soglie di drift
+PSI_DRIFT = 0.2
+MISSING_RATE_DRIFT = 0.05
+PSI_EPS = 1e-4
+
+
+# ────────────────────────────────────────────────────────────────────────────────
+# Profilo per colonna (riepiloghi compatti, salvabili nei metadata del run)
+# ────────────────────────────────────────────────────────────────────────────────
+def _numeric_profile(series: pd.Series) -> Dict[str, Any]:
+    arr = pd.to_numeric(series, errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+    valid = arr[~np.isnan(arr)]
+    missing = int(len(arr) - len(valid))
+    out: Dict[str, Any] = {
+        "kind": "numeric",
+        "dtype": str(series.dtype),
+        "count": int(len(valid)),
+        "missing": missing,
+        "missing_rate": missing / len(arr) if len(arr) else 0.0,
+    }
+    if len(valid):
+        out.update({
+            "min": float(valid.min()),
+            "max": float(valid.max()),
+            "mean": float(valid.mean()),
+            "quantiles": {
+                "probs": QUANTILE_PROBS,
+                "values": [float(v) for v in np.quantile(valid, QUANTILE_PROBS)],
+            },
+        })
+    return out
+
+
+def _categorical_profile(series: pd.Series) -> Dict[str, Any]:
+    """
+    Frequenze relative per categoria; oltre MAX_CATEGORIES le modalità meno
+    frequenti confluiscono in OTHER_CATEGORY.
+    """
+    counts = series.value_counts(dropna=True)
+    missing = int(series.isna().sum())
+    count = int(counts.sum())
+    freq = {str(k): int(n) for k, n in counts.head(MAX_CATEGORIES).items()}
+    if len(counts) > MAX_CATEGORIES:
+        freq[OTHER_CATEGORY] = int(counts.iloc[MAX_CATEGORIES:].sum())
+    return {
+        "kind": "categorical",
+        "dtype": str(series.dtype),
+        "count": count,
+        "missing": missing,
+        "missing_rate": missing / len(series) if len(series) else 0.0,
+        "unique": int(len(counts)),
+        "frequencies": {k: n / count for k, n in freq.items()} if count else {},
+    }
+
+
+# ────────────────────────────────────────────────────────────────────────────────
+# Profilo e validazione dello schema
+# ────────────────────────────────────────────────────────────────────────────────
+def profile_dataframe(df: pd.DataFrame) -> Dict[str, Any]:
+    """
+    Profilo del DF già pulito, colonna per colonna con operazioni vettoriali:
+    missing rate, min/max/media e percentili per le numeriche, frequenze per
+    le categoriche. Il profilo è compatto e basta da solo per il drift.
+    """
+    return {
+        "rows": int(len(df)),
+        "columns": {
+            c: _numeric_profile(df[c]) if is_numeric_column(df, c) else _categorical_profile(df[c])
+            for c in df.columns
+        },
+    }
+
+
+def stats_from_profile(profile: Dict[str, Any], top_k: int = TOP_K_CATEGORIES) -> Dict[str, Any]:
+    """
+    Statistiche per colonna (/api/stats) ricavate dal profilo di ingest, senza
+    nuove scansioni: count/missing per tutte, min/max/mean per le numeriche,
+    top categorie con conteggi per le categoriche.
+    """
+    columns: Dict[str, Dict[str, Any]] = {}
+    for col, prof in profile["columns"].items():
+        entry = {k: prof[k] for k in ("dtype", "count", "missing", "kind") if k in prof}
+        if prof["kind"] == "numeric":
+            for k in ("min", "max", "mean"):
+                entry[k] = prof.get(k)
+        else:
+            entry["unique"] = prof["unique"]
+            top = [(k, f) for k, f in prof["frequencies"].items() if k != OTHER_CATEGORY][:top_k]
+            entry["top"] = [
+                {"value": k, "count": int(round(f * prof["count"]))} for k, f in top
+            ]
+        columns[col] = entry
+    return {"rows": profile["rows"], "columns": columns}
+
+
+def schema_issues(df: pd.DataFrame, target: str = TARGET_DEFAULT) -> List[Dict[str, Any]]:
+    """
+    Confronta le colonne del DF pulito con NUMERIC_COLS/CATEGORICAL_COLS/target.
+    """
+    issues: List[Dict[str, Any]] = []
+    expected = set(NUMERIC_COLS) | set(CATEGORICAL_COLS) | {target}
+    for col in NUMERIC_COLS + CATEGORICAL_COLS + [target]:
+        if col not in df.columns:
+            issues.append({"column": col, "type": "missing_column", "detail": "colonna attesa assente"})
+    for col in df.columns:
+        if col not in expected:
+            issues.append({"column": col, "type": "unexpected_column", "detail": "colonna fuori schema"})
+    for col in CATEGORICAL_COLS:
+        if col in df.columns and df[col].dtype.kind in "if":
+            issues.append({
+                "column": col,
+                "type": "dtype_mismatch",
+                "detail": f"dichiarata categorica ma con dtype {df[col].dtype}",
+            })
+    return issues
+
+
+def validate_and_profile(df_raw: pd.DataFrame) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """
+    Stadio di ingest sul DF appena letto: escludi → pulisci (tracciando le
+    coercizioni) → controllo schema → profilo. Ritorna (df pulito, report).
+    """
+    issues: List[Dict[str, Any]] = []
+    df = clean_dataframe(exclude_columns(df_raw), issues=issues)
+    issues.extend(schema_issues(df))
+    report = {
+        "valid": not any(i["type"] == "missing_column" for i in issues),
+        "issues": issues,
+        "profile": profile_dataframe(df),
+    }
+    return df, report
+
+
+# ────────────────────────────────────────────────────────────────────────────────
+# Drift tra due profili (nessuna nuova scansione dei dati)
+# ────────────────────────────────────────────────────────────────────────────────
+def _psi(expected: np.ndarray, actual: np.ndarray) -> float:
+    e = np.clip(expected, PSI_EPS, None)
+    a = np.clip(actual, PSI_EPS, None)
+    return float(np.sum((a - e) * np.log(a / e)))
+
+
+def _quantile_cdf(quantiles: Dict[str, Any]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    CDF a gradini dai quantili: sui valori ripetuti (colonne discrete) tiene
+    la probabilità massima, così i punti sono strettamente crescenti.
+    """
+    values = np.asarray(quantiles["values"], dtype=float)
+    probs = np.asarray(quantiles["probs"], dtype=float)
+    uniq, inv = np.unique(values, return_inverse=True)
+    cdf = np.zeros(len(uniq))
+    np.maximum.at(cdf, inv, probs)
+    return uniq, cdf
+
+
+def _numeric_psi(ref: Dict[str, Any], cur: Dict[str, Any]) -> Optional[float]:
+    """
+    PSI sui bin definiti dai decili di riferimento; la CDF corrente ai bordi
+    dei bin è interpolata dai suoi percentili.
+    """
+    if "quantiles" not in ref or "quantiles" not in cur:
+        return None
+    ref_values, ref_probs = _quantile_cdf(ref["quantiles"])
+    cur_values, cur_probs = _quantile_cdf(cur["quantiles"])
+    # bordi = punti della CDF di riferimento che raggiungono ciascun decile
+    # (mai dentro un salto, così gli atomi delle colonne discrete restano interi)
+    pick = np.searchsorted(ref_probs, np.linspace(0.0, 1.0, PSI_BINS + 1)[1:] - 1e-9)
+    idx = np.unique(np.minimum(pick, len(ref_values) - 1))
+    edges, ref_cdf = ref_values[idx], ref_probs[idx]
+    cur_cdf = np.interp(edges, cur_values, cur_probs, left=0.0, right=1.0)
+
+    # bin (-inf, e1], (e1, e2], ..., (ek, +inf)
+    expected = np.diff(np.concatenate([[0.0], ref_cdf, [1.0]]))
+    actual = np.diff(np.concatenate([[0.0], cur_cdf, [1.0]]))
+    return _psi(expected, actual)
+
+
+def _categorical_psi(ref: Dict[str, Any], cur: Dict[str, Any]) -> float:
+    keys = sorted(set(ref["frequencies"]) | set(cur["frequencies"]))
+    expected = np.array([ref["frequencies"].get(k, 0.0) for k in keys])
+    actual = np.array([cur["frequencies"].get(k, 0.0) for k in keys])
+    return _psi(expected, actual)
+
+
+def drift_report(reference: Dict[str, Any], current: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Confronta il profilo corrente con quello salvato nei metadata di un run.
+    Una colonna è in drift se PSI > PSI_DRIFT o se il missing rate varia
+    più di MISSING_RATE_DRIFT.
+    """
+    ref_cols = reference.get("columns", {})
+    cur_cols = current.get("columns", {})
+    columns: Dict[str, Dict[str, Any]] = {}
+
+    for col in sorted(set(ref_cols) | set(cur_cols)):
+        ref, cur = ref_cols.get(col), cur_cols.get(col)
+        if ref is None or cur is None:
+            columns[col] = {"status": "added" if ref is None else "removed", "drift": True}
+            continue
+        if ref["kind"] != cur["kind"]:
+            columns[col] = {"status": "kind_changed", "drift": True}
+            continue
+
+        psi = _numeric_psi(ref, cur) if ref["kind"] == "numeric" else _categorical_psi(ref, cur)
+        missing_delta = cur["missing_rate"] - ref["missing_rate"]
+        drift = (psi is not None and psi > PSI_DRIFT) or abs(missing_delta) > MISSING_RATE_DRIFT
+        columns[col] = {
+            "status": "compared",
+            "kind": ref["kind"],
+            "psi": psi,
+            "missing_rate_delta": missing_delta,
+            "drift": drift,
+        }
+
+    drifted = [c for c, r in columns.items() if r["drift"]]
+    return {
+        "reference_rows": reference.get("rows"),
+        "current_rows": current.get("rows"),
+        "thresholds": {"psi": PSI_DRIFT, "missing_rate": MISSING_RATE_DRIFT},
+        "columns": columns,
+        "drifted_columns": drifted,
+        "retrain_recommended": bool(drifted),
+    }
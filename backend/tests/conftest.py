@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# i test importano i moduli come fa app.py (`from ml... import ...`)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
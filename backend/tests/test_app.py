@@ -0,0 +1,75 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import app as app_module
+
+
+@pytest.fixture
+def client():
+    # niente lifespan (nessun preload in background): il DF di default viene
+    # caricato alla prima richiesta
+    app_module._set_active_df(None)
+    yield TestClient(app_module.app)
+    app_module._set_active_df(None)
+
+
+def test_data_page_and_position_cache(client):
+    params = {"limit": 3, "sort": "Age", "desc": "true", "filter": "Gender:eq:Male"}
+    first = client.get("/api/data", params=params)
+    assert first.status_code == 200, first.text
+    body = first.json()
+    assert len(body["records"]) == 3
+    ages = [r["Age"] for r in body["records"]]
+    assert ages == sorted(ages, reverse=True)
+    assert all(r["Gender"] == "Male" for r in body["records"])
+    assert len(app_module._VIEW_CACHE) == 1
+    (key, positions), = app_module._VIEW_CACHE.items()
+
+    # pagina successiva: stesse posizioni dalla cache, nessun nuovo calcolo
+    second = client.get("/api/data", params={**params, "offset": 3}).json()
+    assert app_module._VIEW_CACHE[key] is positions
+    assert second["total"] == body["total"]
+    assert second["records"][0]["Age"] <= ages[-1]
+
+
+def test_data_cache_cleared_on_dataset_swap(client):
+    client.get("/api/data", params={"limit": 1, "sort": "Age"})
+    assert app_module._VIEW_CACHE
+    client.post("/api/reset")
+    assert not app_module._VIEW_CACHE
+
+
+def test_data_cache_skips_stale_write(client, monkeypatch):
+    df, _, report = app_module._get_active_view()
+    real_select_rows = app_module.select_rows
+
+    def select_rows_racing_upload(*args, **kwargs):
+        # un upload arriva mentre la vista viene calcolata
+        app_module._set_active_df(df.copy(), report)
+        return real_select_rows(*args, **kwargs)
+
+    monkeypatch.setattr(app_module, "select_rows", select_rows_racing_upload)
+    assert client.get("/api/data", params={"sort": "Age"}).status_code == 200
+    assert not app_module._VIEW_CACHE
+
+
+def test_data_bad_filter_is_400(client):
+    resp = client.get("/api/data", params={"filter": "Age:between:1"})
+    assert resp.status_code == 400
+    assert "error" in resp.json()
+
+
+def test_preview_uses_active_frame(client):
+    body = client.get("/api/preview", params={"limit": 2}).json()
+    df, _, _ = app_module._get_active_view()
+    assert body["rows"] == len(df)
+    assert len(body["preview"]) == 2
+
+
+def test_stats_served_from_ingest_profile(client):
+    body = client.get("/api/stats").json()
+    _, version, report = app_module._get_active_view()
+    assert body["version"] == version
+    assert body["rows"] == report["profile"]["rows"]
+    assert body["columns"]["CAEC"]["top"][0]["count"] > 0
+    assert body["columns"]["Age"]["min"] == report["profile"]["columns"]["Age"]["min"]
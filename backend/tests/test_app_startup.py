@@ -0,0 +1,36 @@
+import subprocess
+import sys
+import textwrap
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# processo separato: sys.modules "pulito", senza gli import degli altri test
+SCRIPT = textwrap.dedent("""
+    import sys
+    from fastapi.testclient import TestClient
+
+    import app
+
+    with TestClient(app.app) as client:
+        health = client.get("/api/health")
+        preview = client.get("/api/preview?limit=3")
+
+    assert health.status_code == 200, health.text
+    assert preview.status_code == 200, preview.text
+    assert len(preview.json()["preview"]) == 3
+    assert "sklearn" not in sys.modules, "sklearn importato all'avvio"
+    assert "ml.search" not in sys.modules
+    assert app.STARTUP["within_budget"], app.STARTUP
+""")
+
+
+def test_health_and_preview_without_sklearn_within_budget():
+    proc = subprocess.run(
+        [sys.executable, "-c", SCRIPT],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+        timeout=120,
+    )
+    assert proc.returncode == 0, proc.stderr
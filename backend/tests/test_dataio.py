@@ -0,0 +1,94 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from ml.dataio import page_frame, parse_filter, preview_frame, select_rows
+
+
+@pytest.fixture
+def df():
+    return pd.DataFrame({
+        "Age": [30.0, np.nan, 21.0, 45.0, 21.0],
+        "Gender": ["Male", "Female", pd.NA, "female", "Male"],
+        "MTRANS": ["Bike", "Walking", "Bike", "Automobile", "Walking"],
+    })
+
+
+def test_parse_filter_ok():
+    assert parse_filter("Age:gt:30") == ("Age", "gt", "30")
+    # il valore può contenere ":"
+    assert parse_filter("MTRANS:eq:a:b") == ("MTRANS", "eq", "a:b")
+
+
+@pytest.mark.parametrize("spec", ["Age", "Age:gt", "Age:between:1", ":"])
+def test_parse_filter_invalid(spec):
+    with pytest.raises(ValueError):
+        parse_filter(spec)
+
+
+def test_select_rows_numeric_comparison(df):
+    # confronto numerico, non lessicografico ("100" < "30" come stringhe)
+    assert select_rows(df, [("Age", "ge", "30")]).tolist() == [0, 3]
+    assert select_rows(df, [("Age", "lt", "100")]).tolist() == [0, 2, 3, 4]
+
+
+def test_select_rows_string_comparison(df):
+    assert select_rows(df, [("MTRANS", "eq", "Bike")]).tolist() == [0, 2]
+    assert select_rows(df, [("MTRANS", "ne", "Bike")]).tolist() == [1, 3, 4]
+
+
+def test_select_rows_contains_case_insensitive_skips_na(df):
+    assert select_rows(df, [("Gender", "contains", "FEM")]).tolist() == [1, 3]
+
+
+def test_select_rows_combined_filters(df):
+    filters = [("Gender", "eq", "Male"), ("Age", "lt", "25")]
+    assert select_rows(df, filters).tolist() == [4]
+
+
+def test_select_rows_sort_stable_nan_last(df):
+    assert select_rows(df, sort_by="Age").tolist() == [2, 4, 0, 3, 1]
+    # desc: NaN resta in fondo, i pari merito mantengono l'ordine originale
+    assert select_rows(df, sort_by="Age", descending=True).tolist() == [3, 0, 2, 4, 1]
+
+
+def test_select_rows_sort_after_filter(df):
+    positions = select_rows(df, [("MTRANS", "ne", "Automobile")], sort_by="Age", descending=True)
+    assert positions.tolist() == [0, 2, 4, 1]
+
+
+def test_select_rows_unknown_column(df):
+    with pytest.raises(ValueError):
+        select_rows(df, [("Nope", "eq", "x")])
+    with pytest.raises(ValueError):
+        select_rows(df, sort_by="Nope")
+
+
+def test_page_frame_projection_and_meta(df):
+    positions = select_rows(df, sort_by="Age")
+    page, meta = page_frame(df, positions, offset=1, limit=2, columns=["MTRANS", "Age"])
+
+    assert list(page.columns) == ["MTRANS", "Age"]
+    assert page["Age"].tolist() == [21.0, 30.0]
+    assert meta == {"total": 5, "offset": 1, "limit": 2, "columns": ["MTRANS", "Age"]}
+
+
+def test_page_frame_offset_past_end(df):
+    page, meta = page_frame(df, np.arange(len(df)), offset=10, limit=5)
+    assert page.empty
+    assert meta["total"] == 5
+
+
+def test_page_frame_unknown_column(df):
+    with pytest.raises(ValueError):
+        page_frame(df, np.arange(len(df)), columns=["Age", "Nope"])
+
+
+def test_preview_frame_does_not_reclean(df):
+    # il DF attivo è già pulito: la preview non deduplica né rimuove colonne
+    dup = pd.concat([df, df.head(1)], ignore_index=True)
+    page, meta = preview_frame(dup, limit=2)
+    assert len(page) == 2
+    assert meta["rows"] == 6
+    assert meta["columns"] == ["Age", "Gender", "MTRANS"]
+
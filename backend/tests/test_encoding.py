@@ -0,0 +1,59 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+from starlette.requests import Request
+
+from encoding import ARROW_MEDIA_TYPE, ARROW_METADATA_KEY, tabular_response, wants_arrow
+
+
+def _request(accept: str) -> Request:
+    return Request({"type": "http", "headers": [(b"accept", accept.encode())]})
+
+
+@pytest.mark.parametrize("accept, expected", [
+    ("", False),
+    ("*/*", False),
+    ("application/json", False),
+    ("application/vnd.apache.arrow.stream", True),
+    ("application/json, application/vnd.apache.arrow.stream;q=0", False),
+    ("application/json;q=0.5, application/vnd.apache.arrow.stream;q=0.4", False),
+    ("application/vnd.apache.arrow.stream;q=0.9, */*;q=0.1", True),
+])
+def test_wants_arrow(accept, expected):
+    assert wants_arrow(_request(accept)) is expected
+
+
+def test_arrow_response_roundtrip():
+    pa = pytest.importorskip("pyarrow")
+    frame = pd.DataFrame({"Age": [21.0, np.nan], "Gender": ["Male", None]})
+    meta = {"total": 2, "offset": 0, "columns": ["Age", "Gender"]}
+
+    resp = tabular_response(_request(ARROW_MEDIA_TYPE), frame, meta, records_key="records")
+
+    assert resp.media_type == ARROW_MEDIA_TYPE
+    assert resp.headers["vary"] == "Accept"
+    table = pa.ipc.open_stream(resp.body).read_all()
+    assert table.column_names == ["Age", "Gender"]
+    assert table.column("Gender").to_pylist() == ["Male", None]
+    assert table.column("Age").null_count == 1
+    assert json.loads(table.schema.metadata[ARROW_METADATA_KEY]) == meta
+
+
+def test_tabular_response_json_nulls_and_vary():
+    frame = pd.DataFrame({
+        "Age": [21.0, np.nan],
+        "Gender": pd.Series(["Male", pd.NA], dtype="object"),
+    })
+    resp = tabular_response(_request("application/json"), frame, {"total": 2}, records_key="preview")
+
+    assert resp.headers["content-type"] == "application/json"
+    assert resp.headers["vary"] == "Accept"
+    assert json.loads(resp.body) == {
+        "total": 2,
+        "preview": [
+            {"Age": 21.0, "Gender": "Male"},
+            {"Age": None, "Gender": None},
+        ],
+    }
@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from ml.search import stratified_subsample
+
+
+def _imbalanced(counts):
+    y = np.concatenate([np.full(n, cls) for cls, n in enumerate(counts)])
+    X = pd.DataFrame({"x": np.arange(len(y))})
+    return X, y
+
+
+@pytest.mark.parametrize("size", [100, 300, 1000])
+def test_stratified_subsample_respects_size(size):
+    X, y = _imbalanced([2000, 900, 400, 150, 60, 25, 12])
+    X_sub, y_sub = stratified_subsample(X, y, size=size, min_per_class=10)
+    assert len(y_sub) == size
+    assert len(X_sub) == size
+
+
+def test_stratified_subsample_min_per_class():
+    X, y = _imbalanced([2000, 900, 400, 150, 60, 25, 12])
+    _, y_sub = stratified_subsample(X, y, size=100, min_per_class=10)
+    counts = np.bincount(y_sub, minlength=7)
+    assert counts.min() >= 10
+    # la classe maggioritaria resta la più rappresentata
+    assert counts.argmax() == 0
+
+
+def test_stratified_subsample_small_class_fully_kept():
+    X, y = _imbalanced([1000, 3])
+    _, y_sub = stratified_subsample(X, y, size=50, min_per_class=5)
+    assert len(y_sub) == 50
+    assert np.bincount(y_sub)[1] == 3
+
+
+def test_stratified_subsample_too_small_raises():
+    X, y = _imbalanced([500, 500, 500])
+    with pytest.raises(ValueError):
+        stratified_subsample(X, y, size=20, min_per_class=10)
+
+
+def test_stratified_subsample_noop_when_size_exceeds_rows():
+    X, y = _imbalanced([30, 20])
+    X_sub, y_sub = stratified_subsample(X, y, size=100, min_per_class=5)
+    assert X_sub is X and y_sub is y
+
+
+def _toy_frame(n=200):
+    rng = np.random.default_rng(0)
+    y = np.repeat(["a", "b"], n // 2)
+    return pd.DataFrame({
+        "Age": rng.normal(size=n) + (y == "b"),
+        "Gender": rng.choice(["Male", "Female"], size=n),
+        "NObeyesdad": y,
+    })
+
+
+@pytest.mark.parametrize("sample, expected", [
+    (None, None),
+    (1000, {"requested": 1000, "size": 160, "train_rows": 160}),
+    (100, {"requested": 100, "size": 100, "train_rows": 160}),
+])
+def test_train_multi_model_reports_sample(sample, expected):
+    from ml.search import train_multi_model
+
+    out = train_multi_model(_toy_frame(), selected_models=["nb"], cv=2, sample=sample)
+    assert out["sample"] == expected
+    assert out["best_overall"]["fitted_on"] == "full_train"
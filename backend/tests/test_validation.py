@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+
+from ml.validation import (
+    PSI_DRIFT,
+    _numeric_psi,
+    drift_report,
+    profile_dataframe,
+    stats_from_profile,
+    validate_and_profile,
+)
+
+
+def _numeric(values):
+    return profile_dataframe(pd.DataFrame({"Age": values}))["columns"]["Age"]
+
+
+def test_numeric_profile_quantiles():
+    rng = np.random.default_rng(0)
+    prof = _numeric(rng.uniform(0, 100, 50_000))
+    q = dict(zip(prof["quantiles"]["probs"], prof["quantiles"]["values"]))
+
+    assert abs(q[0.5] - 50) < 1.5
+    assert abs(q[0.1] - 10) < 1.5
+    assert q[0.0] == prof["min"] and q[1.0] == prof["max"]
+
+
+def test_numeric_psi_identical_profiles():
+    rng = np.random.default_rng(1)
+    prof = _numeric(rng.normal(25, 5, 5000))
+    assert _numeric_psi(prof, prof) < 1e-6
+
+
+def test_numeric_psi_same_distribution_is_small():
+    rng = np.random.default_rng(2)
+    ref = _numeric(rng.normal(25, 5, 5000))
+    cur = _numeric(rng.normal(25, 5, 5000))
+    assert _numeric_psi(ref, cur) < 0.05
+
+
+def test_numeric_psi_shift_exceeds_threshold():
+    rng = np.random.default_rng(3)
+    ref = _numeric(rng.normal(25, 5, 5000))
+    cur = _numeric(rng.normal(32, 5, 5000))
+    assert _numeric_psi(ref, cur) > PSI_DRIFT
+
+
+def test_numeric_psi_discrete_column_no_false_drift():
+    # colonna con pochi valori ripetuti (es. FCVC): i salti della CDF non
+    # devono essere interpolati come massa continua
+    rng = np.random.default_rng(4)
+    values = rng.choice([1.0, 2.0, 3.0], size=4000, p=[0.1, 0.4, 0.5])
+    ref = _numeric(values)
+    cur = _numeric(rng.permutation(values)[:2000])
+    assert _numeric_psi(ref, cur) < 0.05
+
+
+def test_validate_and_profile_reports_coercions_and_drift():
+    raw = pd.DataFrame({
+        "Id": [1, 2, 3, 4],
+        "Age": ["21", "abc", "30", "40"],
+        "Gender": ["Male", "Female", "Male", "Female"],
+    })
+    _, report = validate_and_profile(raw)
+    types = {(i["column"], i["type"]) for i in report["issues"]}
+
+    assert ("Age", "coerced_to_nan") in types
+    assert ("FAVC", "missing_column") in types
+    assert not report["valid"]
+    assert "Id" not in report["profile"]["columns"]
+
+    drift = drift_report(report["profile"], report["profile"])
+    assert drift["drifted_columns"] == []
+
+
+def test_stats_from_profile_schema_first():
+    df = pd.DataFrame({"FAVC": [0, 1, 1], "Age": [20.0, 30.0, None]})
+    stats = stats_from_profile(profile_dataframe(df))
+    cols = stats["columns"]
+
+    assert stats["rows"] == 3
+    # dichiarata categorica anche se il dtype è numerico
+    assert cols["FAVC"]["kind"] == "categorical"
+    assert cols["FAVC"]["top"] == [{"value": "1", "count": 2}, {"value": "0", "count": 1}]
+    assert cols["Age"]["kind"] == "numeric"
+    assert cols["Age"]["missing"] == 1
+    assert cols["Age"]["mean"] == 25.0
+    assert "quantiles" not in cols["Age"]